@@ -12,10 +12,13 @@ ESB - Script your way to rescue Christmas as part of the ElfScript Brigade team.
 import argparse
 from datetime import datetime
 from enum import Enum, auto
+from functools import lru_cache
+from pathlib import Path
 from zoneinfo import ZoneInfo
 
 from esb import __version__
 from esb import commands as esb_commands
+from esb.commands.base import Command as EsbCommand
 from esb.config import ESBConfig
 from esb.lib.langs import LangMap
 
@@ -108,6 +111,7 @@ def set_arguments(parser, args, kwargs):
     parser.add_argument(*args, **kwargs)
 
 
+@lru_cache(maxsize=1)
 def esb_parser() -> argparse.ArgumentParser:
     description = (
         "Script your way to rescue Christmas as part of the ElfScript Brigade team.\n\n"
@@ -252,35 +256,41 @@ def normalize_arg(args, name):
 ###########################################################
 # CLI main
 ###########################################################
-def main():
+def main(argv: list[str] | None = None, cwd: Path | None = None):
     parser = esb_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     command = Command[args.command]
 
     args = normalize_arg(args, "year")
     args = normalize_arg(args, "day")
     args = normalize_arg(args, "part")
 
+    cmd: EsbCommand
     match command:
         case Command.init:
-            cmd = esb_commands.Init()
+            cmd = esb_commands.Init(cwd=cwd)
         case Command.fetch:
-            cmd = esb_commands.Fetch(args.year, args.day, force=args.force)
+            cmd = esb_commands.Fetch(args.year, args.day, force=args.force, cwd=cwd)
         case Command.start:
-            cmd = esb_commands.Start(args.language, args.year, args.day, force=args.force)
+            cmd = esb_commands.Start(args.language, args.year, args.day, force=args.force, cwd=cwd)
         case Command.show:
-            cmd = esb_commands.Show(args.year, args.day, show_input=args.show_input, show_test=args.show_test)
+            cmd = esb_commands.Show(args.year, args.day, show_input=args.show_input, show_test=args.show_test, cwd=cwd)
         case Command.status:
-            cmd = esb_commands.Status(full=args.full)
+            cmd = esb_commands.Status(full=args.full, cwd=cwd)
         case Command.run:
-            cmd = esb_commands.Run(args.language, args.year, args.day, args.part, submit=args.submit)
+            cmd = esb_commands.Run(args.language, args.year, args.day, args.part, submit=args.submit, cwd=cwd)
         case Command.test:
-            cmd = esb_commands.Test(args.language, args.year, args.day, args.part, args.filter)
+            cmd = esb_commands.Test(args.language, args.year, args.day, args.part, args.filter, cwd=cwd)
         case Command.dashboard:
-            cmd = esb_commands.Dashboard(reset=args.reset)
+            cmd = esb_commands.Dashboard(reset=args.reset, cwd=cwd)
         case _:  # pragma: no cover
             message = "Should never reach here :thinking_face:"
             raise ValueError(message)
-    cmd.execute()
-    if cmd.esb_repo:
-        cmd.update_arg_cache()
+    try:
+        cmd.execute()
+        if cmd.esb_repo:
+            cmd.update_arg_cache()
+    finally:
+        # Commands commit as they go, closing commits the argument cache
+        if cmd.esb_repo:
+            cmd.db.close()
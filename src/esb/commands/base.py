@@ -45,14 +45,16 @@ oprint_warn = Console(style=COLOR_WARN).print
 class Command(ABC):
     db: ElvenCrisisArchive
     repo_root: Path
+    cwd: Path
     lang_map: LangMap
     cache_sled: CacheInputSled
     test_sled: CacheTestSled
     esb_repo: bool = False
 
-    def __init__(self):
+    def __init__(self, *, cwd: Path | None = None):
+        self.cwd = Path.cwd() if cwd is None else cwd.resolve()
         if self.esb_repo:
-            repo_root = find_esb_root(Path.cwd())
+            repo_root = find_esb_root(self.cwd)
             if repo_root is None:
                 eprint_error("Fatal: this is not an ElfScript Brigade repo.")
                 sys.exit(2)
@@ -11,16 +11,21 @@ Script your way to rescue Christmas as part of the ElfScript Brigade team.
 
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from esb.commands.base import Command, oprint_error, oprint_info
 from esb.lib.dash import MdDash
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
 
 class Dashboard(Command):
     reset: bool
     esb_repo: bool = True
 
-    def __init__(self, *, reset: bool = False):
-        super().__init__()
+    def __init__(self, *, reset: bool = False, cwd: Path | None = None):
+        super().__init__(cwd=cwd)
         self.reset = reset
 
     def execute(self):
@@ -13,11 +13,15 @@ from __future__ import annotations
 
 import sys
 from itertools import product
+from typing import TYPE_CHECKING
 
 from esb.commands.base import Command, eprint_error, eprint_info
 from esb.lib.fetch import RudolphFetcher
 from esb.lib.paths import pad_day
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
 
 class Fetch(Command):
     esb_repo: bool = True
@@ -26,8 +30,8 @@ class Fetch(Command):
     days: list[int]
     force: bool
 
-    def __init__(self, years: list[int], days: list[int], *, force: bool = False):
-        super().__init__()
+    def __init__(self, years: list[int], days: list[int], *, force: bool = False, cwd: Path | None = None):
+        super().__init__(cwd=cwd)
         self.years = years
         self.days = days
         self.force = force
@@ -73,7 +77,8 @@ class Fetch(Command):
             sys.exit(2)
 
         input_file.parent.mkdir(parents=True, exist_ok=True)
-        input_file.write_text(puzzle_input)
+        # Solutions read the input as bytes, so it is kept with the same line endings on every platform
+        input_file.write_text(puzzle_input, newline="\n")
 
         tests_file = self.test_sled.path("tests", year, day)
         if not force and tests_file.is_file():
@@ -98,3 +103,4 @@ class Fetch(Command):
             solved_pt1=None,
             solved_pt2=None,
         ).insert(replace=True)
+        self.db.commit()
@@ -12,7 +12,6 @@ Script your way to rescue Christmas as part of the ElfScript Brigade team.
 from __future__ import annotations
 
 import sys
-from pathlib import Path
 
 from esb.commands.base import Command, eprint_error, eprint_info
 from esb.lib.db import ElvenCrisisArchive
@@ -22,12 +21,11 @@ from esb.lib.paths import BlankSled
 class Init(Command):
     esb_repo: bool = False
 
-    @staticmethod
-    def execute():
+    def execute(self):
         eprint_info("Initializing a new ElfScript Brigade repository")
-        cwd = Path.cwd()
+        cwd = self.cwd
 
-        bs = BlankSled(Path.cwd())
+        bs = BlankSled(cwd)
 
         if len(bs.repo_conflicts()) > 0:
             eprint_error(
@@ -41,6 +39,8 @@ class Init(Command):
             eprint_error("Something went wrong! Could not initialize esb repo")
             sys.exit(1)
 
-        ElvenCrisisArchive(cwd).new_repo()
+        archive = ElvenCrisisArchive(cwd)
+        archive.new_repo()
+        archive.close()
 
         eprint_info("ESB repo is ready! Thank you for saving Christmas [italic]Elf[/italic]")
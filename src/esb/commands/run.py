@@ -14,6 +14,7 @@ from __future__ import annotations
 import sys
 from datetime import datetime
 from itertools import product
+from typing import TYPE_CHECKING
 
 from esb.commands.base import Command, eprint_error, eprint_info, eprint_warn
 from esb.commands.dashboard import Dashboard
@@ -23,6 +24,9 @@ from esb.lib.langs import LangRunner, LangSpec
 from esb.lib.paths import LangSled, pad_day
 from esb.protocol import fireplace
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
 
 class Run(Command):
     esb_repo: bool = True
@@ -34,9 +38,16 @@ class Run(Command):
     submit: bool
 
     def __init__(
-        self, lang: LangSpec, years: list[int], days: list[int], parts: list[fireplace.FPPart], *, submit: bool = False
+        self,
+        lang: LangSpec,
+        years: list[int],
+        days: list[int],
+        parts: list[fireplace.FPPart],
+        *,
+        submit: bool = False,
+        cwd: Path | None = None,
     ):
-        super().__init__()
+        super().__init__(cwd=cwd)
         self.lang = lang
         self.years = years
         self.days = days
@@ -81,6 +92,8 @@ class Run(Command):
 
         eprint_info(f"Running solution for: {lang.name}, year {year} day {pad_day(day)} part {part}")
         result = fireplace.exec_protocol_from_file(run_command, part, args, day_wd, day_input)
+        if result.output is not None:
+            sys.stdout.write(result.output)
         match result.status:
             case fireplace.FPStatus.Ok:
                 pass
@@ -111,6 +124,8 @@ class Run(Command):
             time=result.running_time,
             unit=result.unit,
         ).insert()
+        # The run is kept even if submitting fails, and the lock is not held during the request
+        self.db.commit()
 
         if attempt is not None and submit:
             rudolph = RudolphFetcher(self.repo_root)
@@ -121,7 +136,7 @@ class Run(Command):
                     now = datetime.now().astimezone()
                     dl.set_solved(part, now)
                     dp.set_solved(part, attempt, now)
-                    cmd = Dashboard()
+                    cmd = Dashboard(cwd=self.repo_root)
                     cmd.execute()
                 case RudolphSubmitStatus.FAIL:
                     eprint_info("That's not the correct answer :'(")
@@ -151,6 +166,7 @@ class Run(Command):
                 eprint_error(f"✘ Answer pt{part}: {attempt}. Expected: {answer}")
         else:
             eprint_warn(f"Answer pt{part}: {attempt}")
+        self.db.commit()
 
         if result.unit is not None:
             eprint_warn(f"Running time: {result.running_time} {result.unit.name}seconds")
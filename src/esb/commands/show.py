@@ -12,6 +12,7 @@ Script your way to rescue Christmas as part of the ElfScript Brigade team.
 from __future__ import annotations
 
 from itertools import product
+from typing import TYPE_CHECKING
 
 from rich.syntax import Syntax
 
@@ -19,6 +20,9 @@ from esb.commands.base import Command, eprint_error, oprint_error, oprint_info,
 from esb.config import ESBConfig
 from esb.lib.paths import pad_day
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
 
 class Show(Command):
     esb_repo: bool = True
@@ -28,8 +32,16 @@ class Show(Command):
     show_input: bool = False
     show_test: bool = False
 
-    def __init__(self, years: list[int], days: list[int], *, show_input: bool = False, show_test: bool = False):
-        super().__init__()
+    def __init__(
+        self,
+        years: list[int],
+        days: list[int],
+        *,
+        show_input: bool = False,
+        show_test: bool = False,
+        cwd: Path | None = None,
+    ):
+        super().__init__(cwd=cwd)
         self.years = years
         self.days = days
         self.show_input = show_input
@@ -22,6 +22,8 @@ from esb.lib.langs import LangRunner
 from esb.lib.paths import LangSled, pad_day
 
 if TYPE_CHECKING:
+    from pathlib import Path
+
     from esb.lib.langs import LangSpec
 
 
@@ -32,8 +34,10 @@ class Start(Command):
     days: list[int]
     force: bool
 
-    def __init__(self, lang: LangSpec, years: list[int], days: list[int], *, force: bool = False):
-        super().__init__()
+    def __init__(
+        self, lang: LangSpec, years: list[int], days: list[int], *, force: bool = False, cwd: Path | None = None
+    ):
+        super().__init__(cwd=cwd)
         self.lang = lang
         self.years = years
         self.days = days
@@ -48,9 +52,12 @@ class Start(Command):
         day_problem = self.db.ECAPuzzle.find_single({"year": year, "day": day})
         match (day_problem, force):
             case (_, True) | (None, _):
-                cmd = Fetch(years=[year], days=[day], force=force)
+                cmd = Fetch(years=[year], days=[day], force=force, cwd=self.repo_root)
                 cmd.execute()
                 day_problem = self.db.ECAPuzzle.find_single({"year": year, "day": day})
+        if day_problem is None:
+            eprint_error(f"Could not find the puzzle for year {year} day {pad_day(day)}")
+            return
 
         day_language = self.db.ECALanguage.find_single({"year": year, "day": day, "language": lang.name})
         match (day_language, force):
@@ -58,9 +65,10 @@ class Start(Command):
                 pass
             case (self.db.ECALanguage(), True):
                 eprint_warn(
-                    f'Code for "{lang.name}" year {year} day {pad_day(day)} has already started. ' "Overwritting...",
+                    f'Code for "{lang.name}" year {year} day {pad_day(day)} has already started. Overwritting...',
                 )
                 day_language.delete()
+                self.db.commit()
             case (self.db.ECALanguage(), _):
                 eprint_error(
                     f'Code for "{lang.name}" year {year} day {pad_day(day)} has already started. '
@@ -86,5 +94,6 @@ class Start(Command):
             solved_pt1=None,
             solved_pt2=None,
         ).insert(replace=True)
+        self.db.commit()
         eprint_info(f"Started code for {lang.name}, year {year} day {pad_day(day)}")
         eprint_info(f"Open files at {lang_sled.day_dir(year, day)} and happy coding!")
@@ -11,17 +11,26 @@ Script your way to rescue Christmas as part of the ElfScript Brigade team.
 
 from __future__ import annotations
 
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from itertools import product
+from typing import TYPE_CHECKING
 
 from esb.commands.base import (
     Command,
     eprint_error,
     eprint_info,
 )
+from esb.config import ESBConfig
 from esb.lib.langs import LangRunner, LangSpec
 from esb.lib.paths import LangSled, pad_day
 from esb.protocol import fireplace
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
+TestResult = tuple[str, dict, fireplace.FPResult]
+
 
 class Test(Command):
     esb_repo: bool = True
@@ -39,8 +48,10 @@ class Test(Command):
         days: list[int],
         parts: list[fireplace.FPPart],
         filter_test: str | None = None,
+        *,
+        cwd: Path | None = None,
     ):
-        super().__init__()
+        super().__init__(cwd=cwd)
         self.lang = lang
         self.years = years
         self.days = days
@@ -49,37 +60,67 @@ class Test(Command):
         self.load_from_arg_cache()
 
     def execute(self):
-        for year, day, part in product(self.years, self.days, self.parts):
-            self.test_day(self.lang, year, day, part)
-
-    def test_day(
-        self,
-        lang: LangSpec,
-        year: int,
-        day: int,
-        part: fireplace.FPPart,
-    ):
-        if self.find_solution(lang, year, day) is None:
-            return
+        # Database lookups and builds stay in this thread, only the solutions run in the pool
+        lang_sled = LangSled.from_spec(self.repo_root, self.lang)
+        runner = LangRunner(self.lang, lang_sled)
+        jobs = []
+        for year, day in product(self.years, self.days):
+            if self.find_solution(self.lang, year, day) is None:
+                continue
+            day_tests = [
+                (part, tests)
+                for part in self.parts
+                if (tests := self.find_tests(year, day, part, self.filter_test)) != []
+            ]
+            if day_tests == []:
+                continue
 
-        if (tests := self.find_tests(year, day, part, self.filter_test)) == []:
-            return
+            if self.lang.build_command is not None:
+                runner.exec_command(self.lang.build_command, year, day)
+            day_wd = lang_sled.working_dir(year=year, day=day)
+            run_command = runner.prepare_run_command(year=year, day=day)
+            worker_command = (
+                runner.prepare_worker_command(year=year, day=day) if self.lang.worker_command is not None else None
+            )
+            jobs.extend((year, day, (part, day_wd, run_command, worker_command, tests)) for part, tests in day_tests)
 
-        lang_sled = LangSled.from_spec(self.repo_root, lang)
-        runner = LangRunner(lang, lang_sled)
+        with ThreadPoolExecutor(max_workers=ESBConfig.test_workers) as executor:
+            futures = [executor.submit(self.test_day_part, *job) for _, _, job in jobs]
+            # Results are printed in submission order so the output stays readable
+            for (year, day, (part, *_)), future in zip(jobs, futures, strict=True):
+                self.report(self.lang, year, day, part, future.result())
 
-        day_wd = lang_sled.working_dir(year=year, day=day)
-        if lang.build_command is not None:
-            runner.exec_command(lang.build_command, year, day)
+    @staticmethod
+    def test_day_part(
+        part: fireplace.FPPart,
+        day_wd: Path,
+        run_command: list[str],
+        worker_command: list[str] | None,
+        tests: list[tuple[str, dict]],
+    ) -> list[TestResult]:
+        worker = fireplace.FPWorker(worker_command, day_wd) if worker_command is not None else None
+        results = []
+        try:
+            for name, test in tests:
+                day_input = test["input"].encode()
+                args = [str(arg) for arg in test["args"]] if "args" in test else None
+                result = (
+                    worker.exec_protocol(part, args, day_input)
+                    if worker is not None
+                    else fireplace.exec_protocol(run_command, part, args, day_wd, day_input)
+                )
+                results.append((name, test, result))
+        finally:
+            if worker is not None:
+                worker.close()
+        return results
 
-        run_command = runner.prepare_run_command(year=year, day=day)
-        for name, test in tests:
-            day_input_text = test["input"]
-            if "args" in test:
-                test["args"] = [str(arg) for arg in test["args"]]
-            args = test.get("args")
+    @staticmethod
+    def report(lang: LangSpec, year: int, day: int, part: fireplace.FPPart, results: list[TestResult]):
+        for name, test, result in results:
             eprint_info(f"Testing: {name}. Lang: {lang.name}, year {year} day {pad_day(day)} part {part}")
-            result = fireplace.exec_protocol(run_command, part, args, day_wd, day_input_text)
+            if result.output is not None:
+                sys.stdout.write(result.output)
             match (result.status, result.answer == str(test["answer"])):
                 case (fireplace.FPStatus.Ok, True):
                     eprint_info(f"✔ Answer pt{part}: {result.answer}")
@@ -9,6 +9,7 @@ Script your way to rescue Christmas as part of the ElfScript Brigade team.
 (Thank you [Eric 😉!](https://twitter.com/ericwastl)).
 """
 
+import os
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -39,6 +40,15 @@ class ESBConfig:
     part_2 = 2
     max_parts = max(parts)
 
+    # Database
+    db_wal = True
+    db_cache_size = -65536  # Negative values are in KiB
+    db_readers = 4
+    db_fast_env = "ESB_SQLITE_FAST"
+
+    # Test runner
+    test_workers = max((os.cpu_count() or 1) - 2, 1)
+
     # Report
     blank_dash = package_root / blank_dir / "README.md"
     blank_report = package_root / blank_dir / "REPORT.md"
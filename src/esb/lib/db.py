@@ -11,23 +11,102 @@ Script your way to rescue Christmas as part of the ElfScript Brigade team.
 
 from __future__ import annotations
 
+import os
+import queue
 import sqlite3
+import threading
 import uuid
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import TYPE_CHECKING
+from functools import lru_cache
+from operator import attrgetter
+from typing import TYPE_CHECKING, ClassVar
 
 from esb.config import ESBConfig
 from esb.protocol.metric_prefix import MetricPrefix
 
 if TYPE_CHECKING:
-    from collections.abc import Iterator
+    from collections.abc import Generator, Iterable, Iterator
     from pathlib import Path
-    from typing import Any, ClassVar, Self
+    from typing import Any, Self
 
     from esb.protocol.fireplace import FPPart
 
 
+POOL_CLOSED_MESSAGE = "Connection pool is closed"
+
+
+class ConnectionPool:
+    """
+    Read only connections shared between threads
+
+    Connections are opened on demand, up to `size`, and handed to one thread at a time. A thread
+    keeps its connection for nested reads, so iterating a table while querying it never waits on
+    the pool for a second one. Closing the pool closes every connection it opened, including the
+    ones still checked out.
+    """
+
+    db_path: Path
+    size: int
+    connections: list[sqlite3.Connection]
+    closed: bool
+    pool: queue.SimpleQueue[sqlite3.Connection]
+    lock: threading.Lock
+    held: threading.local
+
+    def __init__(self, db_path: Path, size: int):
+        self.db_path = db_path
+        self.size = size
+        self.connections = []
+        self.closed = False
+        self.pool = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.held = threading.local()
+
+    @property
+    def opened(self) -> int:
+        return len(self.connections)
+
+    def open(self) -> sqlite3.Connection:
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        con = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self.connections.append(con)
+        return con
+
+    @contextmanager
+    def connection(self) -> Generator[sqlite3.Connection, None, None]:
+        if (held := getattr(self.held, "con", None)) is not None:
+            yield held
+            return
+        if self.closed:
+            raise RuntimeError(POOL_CLOSED_MESSAGE)
+        try:
+            con = self.pool.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                opened = self.open() if self.opened < self.size else None
+            con = opened if opened is not None else self.pool.get()
+        if self.closed:
+            # Connections returned after closing are already closed, they only wake up the waiting threads
+            self.pool.put(con)
+            raise RuntimeError(POOL_CLOSED_MESSAGE)
+        self.held.con = con
+        try:
+            yield con
+        finally:
+            # An abandoned generator may be finalized by another thread, which holds its own connection
+            if getattr(self.held, "con", None) is con:
+                self.held.con = None
+            self.pool.put(con)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            for con in self.connections:
+                con.close()
+
+
 @dataclass
 class SqlConnection:
     """
@@ -37,8 +116,13 @@ class SqlConnection:
     """
 
     db_path: Path
+    wal: bool = False
+    readers: int = ESBConfig.db_readers
+    isolation_level: str | None = "DEFERRED"  # None is autocommit
     con: sqlite3.Connection = field(init=False, hash=False, repr=False)
     cur: sqlite3.Cursor = field(init=False, hash=False, repr=False)
+    pool: ConnectionPool = field(init=False, hash=False, repr=False)
+    owner: int = field(init=False, hash=False, repr=False)
 
     def __enter__(self):
         return self
@@ -47,19 +131,87 @@ class SqlConnection:
         self.close()
 
     def __post_init__(self):
-        self.con = sqlite3.connect(self.db_path)
+        self.con = sqlite3.connect(self.db_path, isolation_level=self.isolation_level)
         self.cur = self.con.cursor()
+        self.pool = ConnectionPool(self.db_path, self.readers)
+        self.owner = threading.get_ident()
+        self.cur.executescript(f"PRAGMA temp_store = MEMORY; PRAGMA cache_size = {ESBConfig.db_cache_size};")
+        if self.wal:
+            self.cur.executescript("PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL;")
+        if os.environ.get(ESBConfig.db_fast_env) == "1":
+            # Throwaway databases (eg: the test suite) do not need to wait for the disk
+            self.cur.execute("PRAGMA synchronous = OFF")
+
+    def commit(self):
+        self.con.commit()
+
+    @contextmanager
+    def reader(self) -> Generator[sqlite3.Connection, None, None]:
+        # The writer sees its own pending changes. Other threads read the last commit from the pool
+        if threading.get_ident() == self.owner:
+            yield self.con
+            return
+        with self.pool.connection() as con:
+            yield con
 
     def close(self):
+        if not hasattr(self, "db_path"):
+            return
         self.con.commit()
         self.cur.close()
-        if hasattr(self, "db_path"):
-            delattr(self, "db_path")
+        self.con.close()
+        self.pool.close()
+        delattr(self, "db_path")
 
     def list_all_tables(self) -> list[tuple[str, ...]]:
         return [table for (table,) in self.cur.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()]
 
 
+###########################################################
+# Query builders
+###########################################################
+def query_named_placeholders(columns: tuple[str, ...], sep: str = ", ") -> str:
+    return sep.join(f"{column} = :{column}" for column in columns)
+
+
+@lru_cache(maxsize=256)
+def query_select(table_name: str, where: tuple[str, ...] = (), limit: int | None = None) -> str:
+    query = f"SELECT * FROM {table_name}"  # noqa: S608
+    if where:
+        query += f" WHERE {query_named_placeholders(where, sep=' AND ')}"
+    if limit is not None:
+        query += f" LIMIT {limit}"
+    return query
+
+
+@lru_cache(maxsize=256)
+def query_count(table_name: str) -> str:
+    return f"SELECT COUNT(*) FROM {table_name}"  # noqa: S608
+
+
+@lru_cache(maxsize=256)
+def query_insert(table_name: str, columns: tuple[str, ...], *, replace: bool = False) -> str:
+    insert_columns = ", ".join(columns)
+    insert_placeholders = ", ".join(f":{column}" for column in columns)
+    command = "INSERT OR REPLACE" if replace else "INSERT"
+    return f"{command} INTO {table_name} ({insert_columns}) VALUES ({insert_placeholders})"  # noqa: S608
+
+
+@lru_cache(maxsize=256)
+def query_update(table_name: str, columns: tuple[str, ...], where: tuple[str, ...]) -> str:
+    set_params = query_named_placeholders(columns, sep=", ")
+    where_params = query_named_placeholders(where, sep=" AND ")
+    return f"UPDATE {table_name} SET {set_params} WHERE {where_params}"  # noqa: S608
+
+
+@lru_cache(maxsize=256)
+def query_delete(table_name: str, where: tuple[str, ...]) -> str:
+    return f"DELETE FROM {table_name} WHERE {query_named_placeholders(where, sep=' AND ')}"  # noqa: S608
+
+
+UNBOUND_MESSAGE = "Table not bound to any SqlConnection. Call 'bind_connection' before using table"
+
+
 @dataclass(init=False)
 class Table:
     """
@@ -68,40 +220,35 @@ class Table:
     This class depends on an SqlConnection as
     """
 
-    _sql: SqlConnection = field(init=False, hash=False, repr=False)
-    _bound: bool = field(init=False, hash=False, repr=False)
-    _columns: set[str] = field(init=False, hash=False, repr=False)
+    _sql: ClassVar[SqlConnection | None] = None
+    _column_tuple: ClassVar[tuple[str, ...]]
+    _column_getter: ClassVar[staticmethod[[Table], tuple]]
 
-    def __post_init__(self):
-        self._columns = set(self.__annotations__.keys())
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._column_tuple = tuple(cls.__annotations__.keys())
+        getter = attrgetter(*cls._column_tuple)
+        # attrgetter returns a bare value instead of a tuple when there is only one column
+        cls._column_getter = staticmethod(getter if len(cls._column_tuple) > 1 else lambda row: (getter(row),))
 
     def to_dict(self) -> dict[str, Any]:
-        return {column: getattr(self, column, None) for column in self._columns}
+        return dict(zip(self._column_tuple, self._column_getter(self), strict=True))
 
     @classmethod
     def bind_connection(cls, sql: SqlConnection):
         cls._sql = sql
-        cls._bound = True
 
     @classmethod
     def disconnect(cls):
-        if hasattr(cls, "_sql"):
-            delattr(cls, "_sql")
-            delattr(cls, "_bound")
+        cls._sql = None
 
     @classmethod
-    def build_class(cls, row: tuple) -> Self:
-        return cls(**dict(zip(cls.__annotations__.keys(), row, strict=True)))
-
-    @staticmethod
-    def check_connection(fn):
-        def wrapper(cls, *args, **kwargs):
-            if not hasattr(cls, "_bound"):
-                message = "Table not bound to any SqlConnection. Call 'bind_connection' before using table"
-                raise ValueError(message)
-            return fn(cls, *args, **kwargs)
+    def is_bound_to(cls, sql: SqlConnection) -> bool:
+        return cls._sql is sql
 
-        return wrapper
+    @classmethod
+    def build_class(cls, row: tuple) -> Self:
+        return cls(**dict(zip(cls._column_tuple, row, strict=True)))
 
     @staticmethod
     def non_empty_dictionary(arg):
@@ -109,73 +256,83 @@ class Table:
             message = "find received an empty dictionary"
             raise ValueError(message)
 
-    @staticmethod
-    def query_named_placeholders(values: dict[str, Any], sep: str = ", ") -> str:
-        return sep.join(f"{column} = :{column}" for column in values)
-
-    @staticmethod
-    def query_insert_placeholders(values: dict[str, Any]) -> tuple[str, str]:
-        insert_columns = ", ".join(values.keys())
-        insert_placeholders = ", ".join([f":{column}" for column in values])
-        return insert_columns, insert_placeholders
-
     #######################################################
     # SQL operations
     #######################################################
     @classmethod
-    @check_connection
     def fetch_all(cls) -> Iterator[Self]:
-        query = f"SELECT * FROM {cls.__name__}"  # noqa: S608
-        cls._sql.cur.execute(query)
-        for row in cls._sql.cur.fetchall():
-            yield cls.build_class(row)
+        if cls._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
+        query = query_select(cls.__name__)
+        # A dedicated cursor keeps streaming rows even if other queries run while iterating
+        with cls._sql.reader() as con:
+            for row in con.execute(query):
+                yield cls.build_class(row)
 
     @classmethod
-    @check_connection
     def fetch_one(cls) -> Self | None:
-        query = f"SELECT * FROM {cls.__name__} LIMIT 1"  # noqa: S608
-        cls._sql.cur.execute(query)
-        row = cls._sql.cur.fetchone()
+        if cls._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
+        query = query_select(cls.__name__, limit=1)
+        with cls._sql.reader() as con:
+            row = con.execute(query).fetchone()
         if row is None:
             return None
         return cls.build_class(row)
 
     @classmethod
-    @check_connection
     def fetch_single(cls) -> Self:
-        rows = list(cls.fetch_all())
+        if cls._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
+        # Two rows are enough to tell that there is more than one
+        query = query_select(cls.__name__, limit=2)
+        with cls._sql.reader() as con:
+            rows = [cls.build_class(row) for row in con.execute(query).fetchall()]
         if len(rows) != 1:
             message = f"Table {cls.__name__} should have one row and one row only. Got {rows}. Something is wrong."
             raise RuntimeError(message)
         return rows[0]
 
     @classmethod
-    @check_connection
+    def count(cls) -> int:
+        if cls._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
+        with cls._sql.reader() as con:
+            [(count,)] = con.execute(query_count(cls.__name__)).fetchall()
+        return count
+
+    @classmethod
     def find(cls, match: dict) -> Iterator[Self]:
+        if cls._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
         cls.non_empty_dictionary(match)
-        where_params = cls.query_named_placeholders(match, sep=" AND ")
-        query = f"SELECT * FROM {cls.__name__} WHERE {where_params}"  # noqa: S608
-        cls._sql.cur.execute(query, match)
-        for row in cls._sql.cur.fetchall():
-            yield cls.build_class(row)
+        query = query_select(cls.__name__, tuple(match))
+        with cls._sql.reader() as con:
+            for row in con.execute(query, match):
+                yield cls.build_class(row)
 
     @classmethod
-    @check_connection
     def find_one(cls, match: dict) -> Self | None:
+        if cls._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
         cls.non_empty_dictionary(match)
-        where_params = cls.query_named_placeholders(match, sep=" AND ")
-        query = f"SELECT * FROM {cls.__name__} WHERE {where_params} LIMIT 1"  # noqa: S608
-        cls._sql.cur.execute(query, match)
-        match cls._sql.cur.fetchone():
+        query = query_select(cls.__name__, tuple(match), limit=1)
+        with cls._sql.reader() as con:
+            row = con.execute(query, match).fetchone()
+        match row:
             case None:
                 return None
             case row:
                 return cls.build_class(row)
 
     @classmethod
-    @check_connection
     def find_single(cls, match: dict) -> Self | None:
-        rows = list(cls.find(match))
+        if cls._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
+        cls.non_empty_dictionary(match)
+        query = query_select(cls.__name__, tuple(match), limit=2)
+        with cls._sql.reader() as con:
+            rows = [cls.build_class(row) for row in con.execute(query, match).fetchall()]
         match len(rows):
             case 0:
                 return None
@@ -185,21 +342,23 @@ class Table:
                 message = f"Table {cls.__name__} should have found one or zero rows. Got {rows}. Something is wrong."
                 raise RuntimeError(message)
 
-    @check_connection
     def insert(self, *, replace=False):
-        d = self.to_dict()
-        ins_cols, ins_plac = self.query_insert_placeholders(d)
-        query = (
-            f"INSERT INTO {self.__class__.__name__} ({ins_cols}) VALUES ({ins_plac})"  # noqa: S608
-            if not replace
-            else f"INSERT OR REPLACE INTO {self.__class__.__name__} ({ins_cols}) VALUES ({ins_plac})"  # noqa: S608
-        )
-        self._sql.cur.execute(query, d)
-        self._sql.con.commit()
+        if self._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
+        query = query_insert(self.__class__.__name__, self._column_tuple, replace=replace)
+        self._sql.cur.execute(query, self.to_dict())
         return self
 
-    @check_connection
+    @classmethod
+    def insert_many(cls, rows: Iterable[Self], *, replace=False):
+        if cls._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
+        query = query_insert(cls.__name__, cls._column_tuple, replace=replace)
+        cls._sql.cur.executemany(query, (row.to_dict() for row in rows))
+
     def update(self, key: dict, where: list[str] | None = None):
+        if self._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
         for k, v in key.items():
             setattr(self, k, v)
 
@@ -216,20 +375,14 @@ class Table:
             message = "Cannot update with empty fields. Please chose `where`"
             raise ValueError(message)
 
-        where_params = self.query_named_placeholders(where_values, sep=" AND ")
-        set_params = self.query_named_placeholders(key, sep=", ")
-
-        query = f"UPDATE {self.__class__.__name__} SET {set_params} WHERE {where_params}"  # noqa: S608
+        query = query_update(self.__class__.__name__, tuple(key), tuple(where_values))
         self._sql.cur.execute(query, d)
-        self._sql.con.commit()
 
-    @check_connection
     def delete(self):
-        d = self.to_dict()
-        where_params = self.query_named_placeholders(d, sep=" AND ")
-        query = f"DELETE FROM {self.__class__.__name__} WHERE {where_params}"  # noqa: S608
-        self._sql.cur.execute(query, d)
-        self._sql.con.commit()
+        if self._sql is None:
+            raise ValueError(UNBOUND_MESSAGE)
+        query = query_delete(self.__class__.__name__, self._column_tuple)
+        self._sql.cur.execute(query, self.to_dict())
 
 
 ###########################################################
@@ -315,7 +468,6 @@ class ECARun(Table):
     unit: MetricPrefix | None = None
 
     def __post_init__(self):
-        super().__post_init__()
         if isinstance(self.unit, int):
             self.unit = MetricPrefix(self.unit)
 
@@ -323,6 +475,8 @@ class ECARun(Table):
 class ElvenCrisisArchive:
     repo_root: Path
     db_path: Path
+    sql: SqlConnection
+    connections: ClassVar[dict[Path, SqlConnection]] = {}
 
     tables: ClassVar[dict[type[Table], str]] = {
         ECABrigadista: """CREATE TABLE {table_name} (
@@ -368,6 +522,9 @@ class ElvenCrisisArchive:
                                 PRIMARY KEY (id)
                             )""",
     }
+    indexes: ClassVar[list[tuple[type[Table], str]]] = [
+        (ECARun, "CREATE INDEX IF NOT EXISTS idx_ecarun_ydlp ON {table_name} (year, day, language, part)"),
+    ]
     ECABrigadista = ECABrigadista
     ECAPuzzle = ECAPuzzle
     ECALanguage = ECALanguage
@@ -381,13 +538,42 @@ class ElvenCrisisArchive:
         if not self.db_path.parent.is_dir():
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
             self.db_path.touch()
-        self.sql = SqlConnection(self.db_path)
+        self.sql = self.connect(self.db_path)
         for table in self.tables:
             table.bind_connection(self.sql)
 
+    @classmethod
+    def connect(cls, db_path: Path) -> SqlConnection:
+        # Commands may run other commands (eg: start runs fetch). Sharing the connection makes the
+        # pending writes visible to all of them until the transaction is committed.
+        if db_path not in cls.connections:
+            sql = SqlConnection(db_path, wal=ESBConfig.db_wal)
+            # Archives created before an index existed get it the first time they are opened
+            cls.create_indexes(sql)
+            cls.connections[db_path] = sql
+        return cls.connections[db_path]
+
+    def commit(self):
+        self.sql.commit()
+
+    def close(self):
+        self.connections.pop(self.db_path, None)
+        self.sql.close()
+        for table in self.tables:
+            if table.is_bound_to(self.sql):
+                table.disconnect()
+
     def create_tables(self):
         for table, create_table_query in self.tables.items():
             self.sql.cur.execute(create_table_query.format(table_name=table.__name__))
+        self.create_indexes(self.sql)
+
+    @classmethod
+    def create_indexes(cls, sql: SqlConnection):
+        existing_tables = set(sql.list_all_tables())
+        for table, create_index_query in cls.indexes:
+            if table.__name__ in existing_tables:
+                sql.cur.execute(create_index_query.format(table_name=table.__name__))
 
     def new_brigadista(self):
         self.ECABrigadista(brigadista_id=str(uuid.uuid4()), creation_date=datetime.now().astimezone()).insert()
@@ -399,3 +585,4 @@ class ElvenCrisisArchive:
         self.create_tables()
         self.new_brigadista()
         self.new_arg_cache()
+        self.commit()
@@ -14,6 +14,7 @@ from __future__ import annotations
 import json
 import subprocess
 from dataclasses import dataclass
+from functools import cache
 from typing import TYPE_CHECKING
 
 from esb.config import ESBConfig
@@ -21,6 +22,7 @@ from esb.lib.paths import pad_day
 
 if TYPE_CHECKING:
     from pathlib import Path
+    from typing import Any
 
     from esb.lib.paths import LangSled
 
@@ -35,6 +37,7 @@ class LangSpec:
     base: bool = False
     build_command: list[str] | None = None
     install: list[str] | None = None
+    worker_command: list[str] | None = None
 
     @classmethod
     def from_json(cls, file: str | Path):
@@ -47,7 +50,9 @@ class LangMap:
     langs: dict[str, LangSpec]
 
     @classmethod
+    @cache
     def load_defaults(cls):
+        # The boilers ship with the package, their specs do not change while running
         return cls({
             lang.name: LangSpec.from_json(lang / ESBConfig.spec_filename) for lang in ESBConfig.boiler_root.iterdir()
         })
@@ -84,17 +89,23 @@ class LangRunner:
     def prepare_run_command(self, year: int, day: int) -> list[str]:
         return self.prepare_command(self.spec.run_command, year, day)
 
+    def prepare_worker_command(self, year: int, day: int) -> list[str]:
+        if self.spec.worker_command is None:
+            message = f"Cannot prepare worker command because it does not exists for language {self.spec.name}"
+            raise TypeError(message)
+        return self.prepare_command(self.spec.worker_command, year, day)
+
     def prepare_command(self, command: list[str], year: int, day: int) -> list[str]:
-        return [self.replace_files(c, year, day) for c in command]
+        replace_mapping = self.replace_mapping(year, day)
+        return [c.format_map(replace_mapping) for c in command]
 
-    def replace_files(self, c: str, year: int, day: int) -> str:
+    def replace_mapping(self, year: int, day: int) -> dict[str, Any]:
         filenames = {k.name: v.name for k, v in self.sled.boiler_map(year, day).items()}
-        replace_mapping = {
+        return {
             "year": year,
             "day": pad_day(day),
             "filenames": filenames,
         }
-        return c.format_map(replace_mapping)
 
     def exec_command(self, command: list[str], year: int, day: int) -> subprocess.CompletedProcess:
         day_wd = self.sled.working_dir(year=year, day=day)
@@ -12,7 +12,9 @@ Script your way to rescue Christmas as part of the ElfScript Brigade team.
 from __future__ import annotations
 
 import argparse
-import asyncio
+import re
+import shlex
+import subprocess
 import sys
 from collections.abc import Callable
 from dataclasses import dataclass
@@ -20,7 +22,7 @@ from enum import Enum, auto
 from time import perf_counter_ns
 from typing import TYPE_CHECKING, Any, Literal
 
-from esb.protocol.metric_prefix import MetricPrefix
+from esb.protocol.metric_prefix import MetricPrefix, MetricPrefixAbbrev
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -28,31 +30,64 @@ if TYPE_CHECKING:
 AocSolutionFn = Callable[[str, list[str] | None], Any]
 FPPart = Literal[1, 2]
 
+PIPE_BUFFER_SIZE = 1 << 16
+WORKER_EXIT_TIMEOUT = 5
+
 
 ###########################################################
 # Python template runner
 ###########################################################
-def _v1_run(solve_pt1: AocSolutionFn, solve_pt2: AocSolutionFn, part: FPPart, args: list[str]):
+def _v1_solve(solve_pt1: AocSolutionFn, solve_pt2: AocSolutionFn, part: FPPart, input_data: str, args: list[str]):
     match part:
         case 1:
-            return solve_pt1(sys.stdin.read().rstrip(), args)
+            return solve_pt1(input_data, args)
         case 2:
-            return solve_pt2(sys.stdin.read().rstrip(), args)
+            return solve_pt2(input_data, args)
         case _:
             message = f"Part {part} does not exist"
             raise KeyError(message)
 
 
+def _v1_run(solve_pt1: AocSolutionFn, solve_pt2: AocSolutionFn, part: FPPart, args: list[str]):
+    # Reading the raw buffer skips the newline translation of the text layer
+    input_data = sys.stdin.buffer.read().decode("utf-8")
+    return _v1_solve(solve_pt1, solve_pt2, part, input_data.rstrip(), args)
+
+
+def _v1_write_answer(ans: Any, t0: int):
+    sys.stdout.write(f"{ans}\n")
+    dt = perf_counter_ns() - t0
+    time_value = MetricPrefix.nano.format(dt, "seconds", precision=0)
+    sys.stdout.write(f"RT {time_value}\n")
+
+
+def _v1_worker(solve_pt1: AocSolutionFn, solve_pt2: AocSolutionFn, parser: argparse.ArgumentParser):
+    stdin = sys.stdin.buffer
+    while header := stdin.readline():
+        input_data = stdin.read(int(header)).decode("utf-8")
+        stdin.readline()
+        args = parser.parse_args(shlex.split(stdin.readline().decode("utf-8")))
+        t0 = perf_counter_ns()
+        ans = _v1_solve(solve_pt1, solve_pt2, args.part, input_data.rstrip(), args.args)
+        _v1_write_answer(ans, t0)
+        sys.stdout.flush()
+
+
 def v1_run(solve_pt1: AocSolutionFn, solve_pt2: AocSolutionFn):
     parser = argparse.ArgumentParser("Elf Script Brigade Python solution runner")
-    parser.add_argument(
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument(
         "-p",
         "--part",
         choices=[1, 2],
-        required=True,
         type=int,
         help="Run solution part 1 or part 2",
     )
+    mode.add_argument(
+        "--worker",
+        action="store_true",
+        help="Keep running and solve every framed input received from stdin",
+    )
     parser.add_argument(
         "-a",
         "--args",
@@ -60,12 +95,12 @@ def v1_run(solve_pt1: AocSolutionFn, solve_pt2: AocSolutionFn):
         help="Additional arguments for running the solutions",
     )
     args = parser.parse_args()
+    if args.worker:
+        _v1_worker(solve_pt1, solve_pt2, parser)
+        return
     t0 = perf_counter_ns()
     ans = _v1_run(solve_pt1, solve_pt2, args.part, args.args)
-    sys.stdout.write(f"{ans}\n")
-    dt = perf_counter_ns() - t0
-    time_value = MetricPrefix.nano.format(dt, "seconds", precision=0)
-    sys.stdout.write(f"RT {time_value}\n")
+    _v1_write_answer(ans, t0)
 
 
 ###########################################################
@@ -83,53 +118,45 @@ class FPResult:
     answer: str | None = None
     running_time: int | None = None
     unit: MetricPrefix | None = None
+    output: str | None = None
 
 
-# @TODO: type this
-async def _read_output(stream, threshold: int, print_stream) -> str:
-    ret = ""
-    lines = 0
-    while line := await stream.readline():
-        line = line.decode("utf-8")
-        ret += line
-        if lines == threshold:
-            print_stream.write(ret)
-        elif lines > threshold:
-            print_stream.write(line)
-        lines += 1
-    return ret
-
-
-async def _exec_protocol_command(cmd: list[str], cwd: Path, day_input_text: str) -> tuple[int, str]:
-    proc = await asyncio.create_subprocess_exec(
-        *cmd,
+def _echo_output(stdout: str, threshold: int = 2) -> str | None:
+    # Anything beyond the answer and the running time is the solution talking to us
+    return stdout if len(stdout.splitlines()) > threshold else None
+
+
+def _exec_protocol_command(cmd: list[str], cwd: Path, day_input: bytes) -> tuple[int, str]:
+    with subprocess.Popen(
+        cmd,
         cwd=cwd,
-        stdin=asyncio.subprocess.PIPE,
-        stdout=asyncio.subprocess.PIPE,
-    )
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        bufsize=PIPE_BUFFER_SIZE,
+    ) as proc:
+        stdout, _ = proc.communicate(day_input)
+    return proc.returncode, stdout.decode("utf-8")
 
-    if proc.stdin is None:
-        message = "Could not open stdin"
-        raise RuntimeError(message)
 
-    proc.stdin.write(day_input_text.encode())
-    proc.stdin.close()
+def _running_time_units() -> dict[str, MetricPrefix]:
+    units: dict[str, MetricPrefix] = {}
+    for prefix in MetricPrefix:
+        name = prefix.name if prefix is not MetricPrefix._ else ""
+        abbrev = MetricPrefixAbbrev(prefix.value).name if prefix is not MetricPrefix._ else ""
+        units |= {f"{name}second": prefix, f"{name}seconds": prefix, f"{abbrev}s": prefix}
+    return units
 
-    return await asyncio.gather(proc.wait(), _read_output(proc.stdout, threshold=2, print_stream=sys.stdout))
+
+RUNNING_TIME_RE = re.compile(r"RT\s+(\d+)\s+(\S+)\s*")
+RUNNING_TIME_UNITS = _running_time_units()
 
 
 def parse_running_time(running_time_line: str) -> tuple[int, MetricPrefix]:
-    try:
-        match running_time_line.split():
-            case ["RT", running_time_str, unit_str]:
-                running_time = int(running_time_str)
-                unit = MetricPrefix.parse(unit_str, "second", "s")
-                return running_time, unit
-    except Exception as exc:
+    match = RUNNING_TIME_RE.fullmatch(running_time_line)
+    if match is None or match[2] not in RUNNING_TIME_UNITS:
         message = f"Could not parse running time for '{running_time_line}'"
-        raise ValueError(message) from exc
-    message = f"Could not parse running time for '{running_time_line}'"
-    raise ValueError(message)
+        raise ValueError(message)
+    return int(match[1]), RUNNING_TIME_UNITS[match[2]]
 
 
 def exec_protocol_from_file(
@@ -137,8 +164,7 @@ def exec_protocol_from_file(
 ) -> FPResult:
     if not day_input.is_file():
         return FPResult(status=FPStatus.InputDoesNotExists)
-    day_input_text = day_input.read_text()
-    return exec_protocol(command, part, args, cwd, day_input_text)
+    return exec_protocol(command, part, args, cwd, day_input.read_bytes())
 
 
 def exec_protocol(
@@ -146,16 +172,17 @@ def exec_protocol(
     part: FPPart,
     args: list[str] | None,
     cwd: Path,
-    day_input_text: str,
+    day_input: bytes,
 ) -> FPResult:
     cmd = [*command, "--part", f"{part}"]
     if args is not None:
         cmd.extend(["--args", *args])
-    exitcode, stdout = asyncio.run(_exec_protocol_command(cmd, cwd, day_input_text))
+    exitcode, stdout = _exec_protocol_command(cmd, cwd, day_input)
+    output = _echo_output(stdout)
 
     success_exit = 0
     if exitcode != success_exit or not stdout.endswith("\n"):
-        return FPResult(status=FPStatus.ProtocolError)
+        return FPResult(status=FPStatus.ProtocolError, output=output)
 
     running_time = None
     unit = None
@@ -166,6 +193,93 @@ def exec_protocol(
         try:
             running_time, unit = parse_running_time(lines[-1])
         except ValueError:
+            return FPResult(status=FPStatus.ProtocolError, output=output)
+
+    return FPResult(status=FPStatus.Ok, answer=answer, running_time=running_time, unit=unit, output=output)
+
+
+class FPWorker:
+    """
+    Long living solution process
+
+    Instead of starting one process per input, the worker receives each input framed as three
+    parts: a line with the input length in bytes, the input followed by a line break and a line
+    with the arguments (`--part <part> [--args ...]`). It answers with the answer lines followed
+    by the running time line, which is mandatory in this mode. The first line starting with `RT `
+    ends the frame, so neither the answer nor any debug output may start with it.
+    """
+
+    command: list[str]
+    cwd: Path
+    proc: subprocess.Popen | None
+
+    def __init__(self, command: list[str], cwd: Path):
+        self.command = command
+        self.cwd = cwd
+        self.proc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self) -> subprocess.Popen:
+        self.proc = subprocess.Popen(
+            self.command,
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        return self.proc
+
+    def close(self):
+        if self.proc is None:
+            return
+        proc, self.proc = self.proc, None
+        for pipe in (proc.stdin, proc.stdout):
+            if pipe is None:
+                continue
+            try:
+                pipe.close()
+            except BrokenPipeError:
+                pass
+        try:
+            proc.wait(timeout=WORKER_EXIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    def exec_protocol(self, part: FPPart, args: list[str] | None, day_input: bytes) -> FPResult:
+        proc = self.proc if self.proc is not None and self.proc.poll() is None else self.start()
+        if proc.stdin is None or proc.stdout is None:
+            message = "Could not open worker pipes"
+            raise RuntimeError(message)
+
+        cmd = ["--part", f"{part}"]
+        if args is not None:
+            cmd.extend(["--args", *args])
+        try:
+            proc.stdin.write(f"{len(day_input)}\n".encode() + day_input + f"\n{shlex.join(cmd)}\n".encode())
+            proc.stdin.flush()
+        except BrokenPipeError:
+            self.close()
             return FPResult(status=FPStatus.ProtocolError)
 
-    return FPResult(status=FPStatus.Ok, answer=answer, running_time=running_time, unit=unit)
+        answer_lines: list[str] = []
+        while line := proc.stdout.readline().decode("utf-8"):
+            if not line.startswith("RT "):
+                answer_lines.append(line)
+                continue
+            output = _echo_output("".join([*answer_lines, line]))
+            try:
+                running_time, unit = parse_running_time(line)
+            except ValueError:
+                self.close()
+                return FPResult(status=FPStatus.ProtocolError, output=output)
+            answer = "".join(answer_lines).removesuffix("\n")
+            return FPResult(status=FPStatus.Ok, answer=answer, running_time=running_time, unit=unit, output=output)
+
+        # The worker exited before sending the running time
+        self.close()
+        return FPResult(status=FPStatus.ProtocolError, output=_echo_output("".join(answer_lines)))
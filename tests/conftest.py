@@ -0,0 +1,18 @@
+"""
+SPDX-FileCopyrightText: 2024-present Luiz Eduardo Amaral <luizamaral306@gmail.com>
+SPDX-License-Identifier: GPL-3.0-or-later
+
+ESB - Script your way to rescue Christmas as part of the ElfScript Brigade team.
+
+`esb` is a CLI tool to help us _elves_ to save christmas for the
+[Advent Of Code](https://adventofcode.com/) yearly events
+(Thank you [Eric 😉!](https://twitter.com/ericwastl)).
+"""
+
+import os
+
+from esb.config import ESBConfig
+
+
+def pytest_configure(config):  # noqa: ARG001
+    os.environ[ESBConfig.db_fast_env] = "1"
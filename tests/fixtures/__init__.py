@@ -11,13 +11,16 @@ ESB - Script your way to rescue Christmas as part of the ElfScript Brigade team.
 
 import io
 import os
+import shutil
+import sys
 import unittest
-from collections.abc import Iterable
+from collections.abc import Iterator
 from itertools import cycle
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
+from esb.cli import main
 from esb.lib.db import ElvenCrisisArchive
 from esb.lib.fetch import RudolphFetcher
 
@@ -25,11 +28,20 @@ from esb.lib.fetch import RudolphFetcher
 class TestWithTemporaryDirectory(unittest.TestCase):
     current_dir: Path
     tmp_dir: TemporaryDirectory
+    repo_root: Path
+    output_buffers: tuple[io.StringIO, io.StringIO]
 
     def setUp(self):
         self.current_dir = Path.cwd()
         self.tmp_dir = TemporaryDirectory()
         os.chdir(self.tmp_dir.name)
+        # Resolved once, the tests use it instead of asking for the cwd again
+        self.repo_root = Path.cwd()
+        self.output_buffers = (io.StringIO(), io.StringIO())
+
+    def cli_mock(self, http_response: list[str] | None = None) -> "CliMock":
+        # Every command of a test writes to the same buffers. Read them before running the next one
+        return CliMock(http_response, output_buffers=self.output_buffers)
 
     def tearDown(self):
         self.tmp_dir.cleanup()
@@ -37,27 +49,59 @@ class TestWithTemporaryDirectory(unittest.TestCase):
 
 
 class TestWithInitializedEsbRepo(TestWithTemporaryDirectory):
-    repo_root: Path
-
     def setUp(self):
         super().setUp()
-        self.repo_root = Path.cwd()
         # Creates the db file
         # This is the condition for a directory to be considered an esb repository
-        ElvenCrisisArchive(self.repo_root).new_repo()
+        archive = ElvenCrisisArchive(self.repo_root)
+        archive.new_repo()
+        archive.close()
+
+
+class TestWithEsbRepoTemplate(TestWithTemporaryDirectory):
+    """
+    Runs `esb init` once per class and copies the resulting repo into each test directory
+    """
+
+    template_dir: TemporaryDirectory
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        current_dir = Path.cwd()
+        cls.template_dir = TemporaryDirectory()
+        os.chdir(cls.template_dir.name)
+        try:
+            with CliMock():
+                main(["init"])
+        finally:
+            os.chdir(current_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.template_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        shutil.copytree(self.template_dir.name, self.repo_root, dirs_exist_ok=True)
 
 
 class HttpMock:
     http_response: list[str]
-    responses: Iterable[str]
+    responses: Iterator[str]
 
     def __init__(self, http_response: list[str]):
+        self.respond(http_response)
+
+    def respond(self, http_response: list[str]):
         self.http_response = http_response
-        self.next_response = cycle(self.http_response)
+        self.responses = cycle(self.http_response)
 
-    def __enter__(self):
-        self.stderr = io.StringIO()
-        self.stdout = io.StringIO()
+    def next_response(self, *_args, **_kwargs) -> str:
+        return next(self.responses)
+
+    def start(self):
         self.patchers = [
             patch("esb.lib.fetch.RudolphFetcher.aoc_get", side_effect=self.next_response),
             patch("esb.lib.fetch.RudolphFetcher.aoc_post", side_effect=self.next_response),
@@ -67,39 +111,49 @@ class HttpMock:
         for patcher in self.patchers:
             patcher.start()
 
+    def stop(self):
+        for patcher in reversed(self.patchers):
+            patcher.stop()
+
+    def __enter__(self):
+        self.start()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        for patcher in reversed(self.patchers):
-            patcher.stop()
+        self.stop()
 
 
 class CliMock(HttpMock):
-    command: list[str]
+    """
+    Captures the cli output
+
+    The http requests are only mocked when `http_response` is given, so an HttpMock started by
+    the test class can answer them instead. The output is written to `output_buffers` when given,
+    which are emptied when entering, or to new buffers otherwise.
+    """
+
     http_response: list[str]
     stderr: io.StringIO
     stdout: io.StringIO
 
-    def __init__(self, command: list[str], http_response: list[str] | None = None):
-        if http_response is None:
-            http_response = [""]
-        super().__init__(http_response)
-        self.command = command
+    def __init__(
+        self, http_response: list[str] | None = None, output_buffers: tuple[io.StringIO, io.StringIO] | None = None
+    ):
+        self.mock_http = http_response is not None
+        super().__init__(http_response or [""])
+        self.stderr, self.stdout = output_buffers if output_buffers is not None else (io.StringIO(), io.StringIO())
 
     def __enter__(self):
-        super().__enter__()
-
-        self.stderr = io.StringIO()
-        self.stdout = io.StringIO()
-        new_patchers = [
-            patch("sys.argv", self.command),
-            patch("sys.stderr", new_callable=lambda: self.stderr),
-            patch("sys.stdout", new_callable=lambda: self.stdout),
-        ]
-
-        self.patchers = [*self.patchers, *new_patchers]
-
-        for patcher in new_patchers:
-            patcher.start()
+        if self.mock_http:
+            self.start()
+        else:
+            self.patchers = []
+
+        for buffer in (self.stderr, self.stdout):
+            buffer.seek(0)
+            buffer.truncate()
+        output_patcher = patch.multiple(sys, stderr=self.stderr, stdout=self.stdout)
+        output_patcher.start()
+        self.patchers = [*self.patchers, output_patcher]
 
         return self
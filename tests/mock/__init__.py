@@ -9,6 +9,7 @@ ESB - Script your way to rescue Christmas as part of the ElfScript Brigade team.
 (Thank you [Eric 😉!](https://twitter.com/ericwastl)).
 """
 
+from functools import cache
 from pathlib import Path
 
 MOCK_ROOT = Path(__file__).parent
@@ -28,3 +29,9 @@ SUBMIT_TIMEOUT = MOCK_ROOT / "submit_timeout.html"
 TESTS_SUCCESS_TOML = MOCK_ROOT / "tests_success.toml"
 TESTS_ERROR_TOML = MOCK_ROOT / "tests_error.toml"
 TESTS_MISSING_TOML = MOCK_ROOT / "tests_missing.toml"
+
+
+@cache
+def read_mock(path: Path) -> str:
+    # Mock files are only read by the tests that use them, and only once
+    return path.read_text()
@@ -9,8 +9,6 @@ ESB - Script your way to rescue Christmas as part of the ElfScript Brigade team.
 (Thank you [Eric 😉!](https://twitter.com/ericwastl)).
 """
 
-from pathlib import Path
-
 from esb.lib.boiler import CodeFurnace
 from esb.lib.langs import LangMap
 from esb.lib.paths import LangSled
@@ -26,7 +24,7 @@ class TestBoiler(TestWithInitializedEsbRepo):
 
     def load_lang_sled(self, lang_name: str) -> tuple[LangSled, LangMap]:
         lang_spec = self.lmap.get(lang_name)
-        return LangSled(repo_root=Path.cwd(), name=lang_name, files=lang_spec.files), lang_spec
+        return LangSled(repo_root=self.repo_root, name=lang_name, files=lang_spec.files), lang_spec
 
     def assert_files(self, lang_sled: LangSled):
         for dst in lang_sled.copied_map(self.year, self.day).values():
@@ -9,7 +9,12 @@ ESB - Script your way to rescue Christmas as part of the ElfScript Brigade team.
 (Thank you [Eric 😉!](https://twitter.com/ericwastl)).
 """
 
+import sqlite3
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, replace
+from operator import attrgetter
 from pathlib import Path
 
 import pytest
@@ -22,195 +27,366 @@ class TestSqlConnection(TestWithTemporaryDirectory):
     db_path = Path("my_test.sqlite")
 
     def test_context_manager(self):
-        with db.SqlConnection(self.db_path) as sql:
+        with db.SqlConnection(self.db_path, isolation_level=None) as sql:
             sql.cur.execute("CREATE TABLE ctx_man (value)")
-            sql.con.commit()
             tables_after = sql.list_all_tables()
             assert len(tables_after) == 1
 
     def test_list_all_tables(self):
-        sql = db.SqlConnection(self.db_path)
+        sql = db.SqlConnection(self.db_path, isolation_level=None)
         tables_before = sql.list_all_tables()
         assert len(tables_before) == 0
         sql.cur.execute("CREATE TABLE list_all_1 (value)")
         sql.cur.execute("CREATE TABLE list_all_2 (value)")
-        sql.con.commit()
         tables_after = sql.list_all_tables()
         assert len(tables_after) == 2
         sql.close()
 
+    def test_journal_mode(self):
+        with db.SqlConnection(self.db_path) as sql:
+            [(journal_mode,)] = sql.cur.execute("PRAGMA journal_mode").fetchall()
+            assert journal_mode == "delete"
+
+    def test_journal_mode_wal(self):
+        with db.SqlConnection(self.db_path, wal=True) as sql:
+            [(journal_mode,)] = sql.cur.execute("PRAGMA journal_mode").fetchall()
+            assert journal_mode == "wal"
+
+    def test_autocommit(self):
+        with db.SqlConnection(self.db_path, isolation_level=None) as sql:
+            sql.cur.execute("CREATE TABLE autocommit (value)")
+            sql.cur.execute("INSERT INTO autocommit VALUES (1)")
+            assert not sql.con.in_transaction
+            con = sqlite3.connect(self.db_path)
+            assert con.execute("SELECT value FROM autocommit").fetchall() == [(1,)]
+            con.close()
+
+    def test_synchronous_is_off_in_fast_mode(self):
+        with db.SqlConnection(self.db_path, wal=True) as sql:
+            [(synchronous,)] = sql.cur.execute("PRAGMA synchronous").fetchall()
+            assert synchronous == 0
+
+    def test_reader_is_the_writer_connection_on_the_owner_thread(self):
+        with db.SqlConnection(self.db_path) as sql, sql.reader() as con:
+            assert con is sql.con
+
+    def test_reader_uses_read_only_connections_on_other_threads(self):
+        with db.SqlConnection(self.db_path) as sql:
+            sql.cur.execute("CREATE TABLE pool (value)")
+            sql.cur.execute("INSERT INTO pool VALUES (1)")
+            sql.commit()
+
+            def read():
+                with sql.reader() as con:
+                    assert con is not sql.con
+                    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+                        con.execute("INSERT INTO pool VALUES (2)")
+                    return con.execute("SELECT value FROM pool").fetchall()
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda _: read(), range(16)))
+            assert results == [[(1,)]] * 16
+            assert sql.pool.opened <= sql.readers
+
+    def test_nested_reads_on_other_threads_reuse_the_held_connection(self):
+        with db.SqlConnection(self.db_path, readers=2) as sql:
+            sql.cur.execute("CREATE TABLE pool (value)")
+            sql.cur.executemany("INSERT INTO pool VALUES (?)", [(1,), (2,), (3,)])
+            sql.commit()
+
+            def read():
+                values = []
+                with sql.reader() as outer:
+                    for (value,) in outer.execute("SELECT value FROM pool"):
+                        with sql.reader() as inner:
+                            assert inner is outer
+                            values.extend(inner.execute("SELECT value FROM pool WHERE value = ?", (value,)))
+                return values
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [executor.submit(read) for _ in range(4)]
+                results = [future.result(timeout=10) for future in futures]
+            assert results == [[(1,), (2,), (3,)]] * 4
+            assert sql.pool.opened <= sql.readers
+
+    def test_close_closes_connections_checked_out_by_other_threads(self):
+        sql = db.SqlConnection(self.db_path)
+        checked_out = threading.Event()
+        release = threading.Event()
+
+        def read():
+            with sql.pool.connection() as con:
+                checked_out.set()
+                release.wait(timeout=10)
+            return con
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(read)
+            checked_out.wait(timeout=10)
+            sql.close()
+            release.set()
+            con = future.result(timeout=10)
+        with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+            con.execute("SELECT 1")
+        with pytest.raises(RuntimeError, match="closed"), sql.pool.connection():
+            pass
+        assert sql.pool.opened == 1
+
     def test_calling_close_twice_doesnt_raise_an_exception(self):
         sql = db.SqlConnection(self.db_path)
         sql.close()
         sql.close()
 
 
-class TestTable(TestWithTemporaryDirectory):
-    @dataclass(unsafe_hash=True)
-    class SantaTable(db.Table):
-        idx: int
-        value: int
-        text: str
+@dataclass(unsafe_hash=True)
+class SantaTable(db.Table):
+    idx: int
+    value: int
+    text: str
 
-    db_path = Path("my_test.sqlite")
+
+by_idx = attrgetter("idx")
+
+
+class TestTable(unittest.TestCase):
+    db_path = ":memory:"
+    template: sqlite3.Connection
     row0 = SantaTable(idx=1, value=123, text="abc")
     row1 = SantaTable(idx=2, value=456, text="def")
     row2 = SantaTable(idx=3, value=789, text="ghi")
 
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The schema is created once and copied into a fresh in-memory database for each test
+        cls.template = sqlite3.connect(cls.db_path)
+        cls.template.execute("CREATE TABLE SantaTable (idx INTEGER NOT NULL PRIMARY KEY, value, text)")
+        cls.template.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.template.close()
+        super().tearDownClass()
+
     def setUp(self):
         super().setUp()
         self.sql = db.SqlConnection(self.db_path)
-        self.SantaTable.bind_connection(self.sql)
-        self.sql.cur.execute("CREATE TABLE SantaTable (idx INTEGER NOT NULL PRIMARY KEY, value, text)")
-        self.sql.con.commit()
+        self.template.backup(self.sql.con)
+        SantaTable.bind_connection(self.sql)
+
+    def tearDown(self):
+        self.sql.close()
+        super().tearDown()
 
     def test_unbound_table_shoud_raise_exception(self):
-        self.SantaTable.disconnect()
+        SantaTable.disconnect()
         with pytest.raises(ValueError, match="Table not bound"):
             self.row0.insert()
 
+    def test_is_bound_to(self):
+        assert SantaTable.is_bound_to(self.sql)
+        SantaTable.disconnect()
+        assert not SantaTable.is_bound_to(self.sql)
+
     def test_insert(self):
-        assert len(list(self.SantaTable.fetch_all())) == 0
+        assert SantaTable.count() == 0
         self.row0.insert()
-        assert len(list(self.SantaTable.fetch_all())) == 1
+        assert SantaTable.count() == 1
         self.row1.insert()
-        assert len(list(self.SantaTable.fetch_all())) == 2
+        assert SantaTable.count() == 2
 
     def test_insert_with_replace(self):
         self.row0.insert(replace=True)
         row0_copy = replace(self.row0, value=321)
         row0_copy.insert(replace=True)
-        frow0 = self.SantaTable.fetch_single()
+        frow0 = SantaTable.fetch_single()
         assert self.row0 != frow0
         assert row0_copy == frow0
 
+    def test_insert_many(self):
+        SantaTable.insert_many([self.row0, self.row1, self.row2])
+        assert sorted(SantaTable.fetch_all(), key=by_idx) == [self.row0, self.row1, self.row2]
+
+    def test_insert_many_with_replace(self):
+        row0_copy = replace(self.row0, value=321)
+        SantaTable.insert_many([self.row0, self.row1])
+        SantaTable.insert_many([row0_copy], replace=True)
+        assert sorted(SantaTable.fetch_all(), key=by_idx) == [row0_copy, self.row1]
+
     def test_update(self):
         self.row0.insert(replace=True)
         update_value = 321
         self.row0.update(key={"value": update_value})
-        frow0 = self.SantaTable.fetch_single()
+        frow0 = SantaTable.fetch_single()
         assert frow0.value == update_value
         assert self.row0.value == update_value
 
     def test_fetch_all(self):
-        self.row0.insert()
-        self.row1.insert()
-        self.row2.insert()
-        assert set(self.SantaTable.fetch_all()) == {
-            self.row0,
-            self.row1,
-            self.row2,
-        }
+        SantaTable.insert_many([self.row0, self.row1, self.row2])
+        assert sorted(SantaTable.fetch_all(), key=by_idx) == [self.row0, self.row1, self.row2]
+
+    def test_count(self):
+        assert SantaTable.count() == 0
+        SantaTable.insert_many([self.row0, self.row1, self.row2])
+        assert SantaTable.count() == 3
+
+    def test_fetch_all_keeps_iterating_when_other_queries_run(self):
+        SantaTable.insert_many([self.row0, self.row1, self.row2])
+        rows = []
+        for row in SantaTable.fetch_all():
+            assert SantaTable.find_one({"idx": row.idx}) == row
+            rows.append(row)
+        assert len(rows) == 3
 
     def test_fetch_one(self):
-        assert self.SantaTable.fetch_one() is None
-        self.row0.insert()
-        self.row1.insert()
-        frow0 = self.SantaTable.fetch_one()
+        assert SantaTable.fetch_one() is None
+        SantaTable.insert_many([self.row0, self.row1])
+        frow0 = SantaTable.fetch_one()
         assert frow0 == self.row0
         assert id(frow0) != id(self.row0)
 
     def test_fetch_single(self):
         self.row0.insert()
-        frow0 = self.SantaTable.fetch_single()
+        frow0 = SantaTable.fetch_single()
         assert frow0 == self.row0
         assert id(frow0) != id(self.row0)
 
     def test_fetch_single_cannot_have_no_rows(self):
         with pytest.raises(RuntimeError, match="should have one row"):
-            self.SantaTable.fetch_single()
+            SantaTable.fetch_single()
 
     def test_fetch_single_cannot_have_more_than_one_row(self):
-        self.row0.insert()
-        self.row1.insert()
+        SantaTable.insert_many([self.row0, self.row1])
         with pytest.raises(RuntimeError, match="should have one row"):
-            self.SantaTable.fetch_single()
+            SantaTable.fetch_single()
 
     def test_find_int(self):
         self.row0.insert()
         row0_copy = replace(self.row0, idx=4)
-        row0_copy.insert()
-        self.row1.insert()
+        SantaTable.insert_many([row0_copy, self.row1])
 
-        find0 = list(self.SantaTable.find({"value": 123}))
-        assert len(find0) == 2
-        assert set(find0) == {self.row0, row0_copy}
+        find0 = sorted(SantaTable.find({"value": 123}), key=by_idx)
+        assert find0 == [self.row0, row0_copy]
 
     def test_find_str(self):
         self.row0.insert()
         row0_copy = replace(self.row0, idx=4)
-        row0_copy.insert()
-        self.row1.insert()
+        SantaTable.insert_many([row0_copy, self.row1])
+
+        find0 = sorted(SantaTable.find({"text": "abc"}), key=by_idx)
+        assert find0 == [self.row0, row0_copy]
 
-        find0 = list(self.SantaTable.find({"text": "abc"}))
-        assert len(find0) == 2
-        assert set(find0) == {self.row0, row0_copy}
+    def test_find_keeps_iterating_when_other_queries_run(self):
+        SantaTable.insert_many([self.row0, replace(self.row0, idx=4), self.row1])
+        rows = []
+        for row in SantaTable.find({"text": "abc"}):
+            assert SantaTable.find_one({"idx": row.idx}) == row
+            rows.append(row)
+        assert len(rows) == 2
 
     def test_find_cannot_pass_empty_dictionary(self):
         with pytest.raises(ValueError, match="empty dictionary"):
-            list(self.SantaTable.find({}))
+            list(SantaTable.find({}))
 
     def test_find_one(self):
-        self.row0.insert()
-        replace(self.row0, idx=4).insert()
-        self.row1.insert()
+        SantaTable.insert_many([self.row0, replace(self.row0, idx=4), self.row1])
 
-        row0 = self.SantaTable.find_one({"text": "abc"})
+        row0 = SantaTable.find_one({"text": "abc"})
         assert self.row0 == row0
 
     def test_find_one_no_match(self):
-        self.row0.insert()
-        self.row1.insert()
+        SantaTable.insert_many([self.row0, self.row1])
 
-        row0 = self.SantaTable.find_one({"text": "no-match"})
+        row0 = SantaTable.find_one({"text": "no-match"})
         assert row0 is None
 
     def test_find_one_cannot_pass_empty_dictionary(self):
         with pytest.raises(ValueError, match="empty dictionary"):
-            self.SantaTable.find_one({})
+            SantaTable.find_one({})
 
     def test_find_single(self):
-        self.row0.insert()
-        self.row1.insert()
+        SantaTable.insert_many([self.row0, self.row1])
 
-        row0 = self.SantaTable.find_single({"text": "abc"})
+        row0 = SantaTable.find_single({"text": "abc"})
         assert self.row0 == row0
 
     def test_find_single_no_match(self):
-        self.row0.insert()
-        self.row1.insert()
+        SantaTable.insert_many([self.row0, self.row1])
 
-        row0 = self.SantaTable.find_single({"text": "no-match"})
+        row0 = SantaTable.find_single({"text": "no-match"})
         assert row0 is None
 
     def test_find_single_cannot_pass_empty_dictionary(self):
         with pytest.raises(ValueError, match="empty dictionary"):
-            self.SantaTable.find_single({})
+            SantaTable.find_single({})
 
     def test_find_single_cannot_have_more_than_one_row(self):
-        self.row0.insert()
-        replace(self.row0, idx=4).insert()
+        SantaTable.insert_many([self.row0, replace(self.row0, idx=4)])
         with pytest.raises(RuntimeError, match="should have found one or zero rows"):
-            self.SantaTable.find_single({"text": "abc"})
+            SantaTable.find_single({"text": "abc"})
 
     def test_delete(self):
-        self.row0.insert()
-        self.row1.insert()
-        rows = list(self.SantaTable.fetch_all())
-        assert len(rows) == 2
+        SantaTable.insert_many([self.row0, self.row1])
+        assert SantaTable.count() == 2
         self.row1.delete()
-        rows = list(self.SantaTable.fetch_all())
-        assert len(rows) == 1
-        [row0] = rows
-        assert self.row0 == row0
+        assert SantaTable.count() == 1
+        assert SantaTable.fetch_single() == self.row0
         self.row0.delete()
-        rows = list(self.SantaTable.fetch_all())
-        assert len(rows) == 0
+        assert SantaTable.count() == 0
 
 
 class TestElvenCrisisArchive(TestWithTemporaryDirectory):
     def test_create_tables(self):
-        repo_root = Path.cwd()
-        archive = db.ElvenCrisisArchive(repo_root)
+        archive = db.ElvenCrisisArchive(self.repo_root)
         archive.create_tables()
         assert len(archive.sql.list_all_tables()) > 0
+        archive.close()
+
+    def test_create_tables_creates_indexes(self):
+        archive = db.ElvenCrisisArchive(self.repo_root)
+        archive.create_tables()
+        indexes = archive.sql.cur.execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()
+        archive.close()
+        assert ("idx_ecarun_ydlp",) in indexes
+
+    def test_opening_an_archive_creates_missing_indexes(self):
+        archive = db.ElvenCrisisArchive(self.repo_root)
+        archive.new_repo()
+        archive.sql.cur.execute("DROP INDEX idx_ecarun_ydlp")
+        archive.close()
+
+        archive = db.ElvenCrisisArchive(self.repo_root)
+        indexes = archive.sql.cur.execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()
+        archive.close()
+        assert ("idx_ecarun_ydlp",) in indexes
+
+    def test_archives_for_the_same_repo_share_the_connection(self):
+        archive = db.ElvenCrisisArchive(self.repo_root)
+        assert db.ElvenCrisisArchive(self.repo_root).sql is archive.sql
+        archive.close()
+        reopened = db.ElvenCrisisArchive(self.repo_root)
+        assert reopened.sql is not archive.sql
+        reopened.close()
+
+    def test_close_unbinds_the_tables(self):
+        archive = db.ElvenCrisisArchive(self.repo_root)
+        archive.new_repo()
+        archive.close()
+        with pytest.raises(ValueError, match="not bound"):
+            archive.ECABrigadista.fetch_single()
+        assert archive.db_path not in db.ElvenCrisisArchive.connections
+
+    def test_writes_are_committed_on_close(self):
+        archive = db.ElvenCrisisArchive(self.repo_root)
+        archive.new_repo()
+        archive.new_brigadista()
+
+        def count_brigadistas():
+            con = sqlite3.connect(archive.db_path)
+            [(count,)] = con.execute("SELECT COUNT(*) FROM ECABrigadista").fetchall()
+            con.close()
+            return count
+
+        assert count_brigadistas() == 1
+        archive.close()
+        assert count_brigadistas() == 2
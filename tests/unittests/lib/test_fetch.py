@@ -11,7 +11,7 @@ ESB - Script your way to rescue Christmas as part of the ElfScript Brigade team.
 
 from esb.lib.fetch import RudolphFetcher, RudolphSubmitStatus
 from tests.fixtures import HttpMock, TestWithInitializedEsbRepo
-from tests.mock import SUBMIT_ALREADY_COMPLETE, SUBMIT_FAIL, SUBMIT_SUCCESS, SUBMIT_TIMEOUT
+from tests.mock import SUBMIT_ALREADY_COMPLETE, SUBMIT_FAIL, SUBMIT_SUCCESS, SUBMIT_TIMEOUT, read_mock
 
 
 class TestRudolphFetcher(TestWithInitializedEsbRepo):
@@ -19,25 +19,25 @@ class TestRudolphFetcher(TestWithInitializedEsbRepo):
     TEST_DAY = 1
 
     def test_fetch_submit_success(self):
-        with HttpMock([SUBMIT_SUCCESS.read_text()]):
+        with HttpMock([read_mock(SUBMIT_SUCCESS)]):
             rf = RudolphFetcher(self.repo_root)
             submit_status = rf.fetch_submit(self.TEST_YEAR, self.TEST_DAY, 1, "Any")
         assert submit_status == RudolphSubmitStatus.SUCCESS
 
     def test_fetch_submit_fail(self):
-        with HttpMock([SUBMIT_FAIL.read_text()]):
+        with HttpMock([read_mock(SUBMIT_FAIL)]):
             rf = RudolphFetcher(self.repo_root)
             submit_status = rf.fetch_submit(self.TEST_YEAR, self.TEST_DAY, 1, "Any")
         assert submit_status == RudolphSubmitStatus.FAIL
 
     def test_fetch_submit_timeout(self):
-        with HttpMock([SUBMIT_TIMEOUT.read_text()]):
+        with HttpMock([read_mock(SUBMIT_TIMEOUT)]):
             rf = RudolphFetcher(self.repo_root)
             submit_status = rf.fetch_submit(self.TEST_YEAR, self.TEST_DAY, 1, "Any")
         assert submit_status == RudolphSubmitStatus.TIMEOUT
 
     def test_fetch_submit_already_complete(self):
-        with HttpMock([SUBMIT_ALREADY_COMPLETE.read_text()]):
+        with HttpMock([read_mock(SUBMIT_ALREADY_COMPLETE)]):
             rf = RudolphFetcher(self.repo_root)
             submit_status = rf.fetch_submit(self.TEST_YEAR, self.TEST_DAY, 1, "Any")
         assert submit_status == RudolphSubmitStatus.ALREADY_COMPLETE
@@ -10,9 +10,11 @@ ESB - Script your way to rescue Christmas as part of the ElfScript Brigade team.
 """
 
 import unittest
+from pathlib import Path
 
 from esb.config import ESBConfig
-from esb.lib.langs import LangMap, LangSpec
+from esb.lib.langs import LangMap, LangRunner, LangSpec
+from esb.lib.paths import LangSled
 
 
 class TestLangSpec(unittest.TestCase):
@@ -26,3 +28,18 @@ class TestLangMap(unittest.TestCase):
         lang_name = "python"
         lang_map = LangMap.load_defaults()
         assert lang_name in lang_map.names
+
+    def test_load_defaults_is_cached(self):
+        assert LangMap.load_defaults() is LangMap.load_defaults()
+
+
+class TestLangRunner(unittest.TestCase):
+    def setUp(self):
+        self.spec = LangSpec.from_json(ESBConfig.boiler_root / "python" / ESBConfig.spec_filename)
+        self.sled = LangSled.from_spec(Path("/repo"), self.spec)
+
+    def test_prepare_run_command(self):
+        runner = LangRunner(self.spec, self.sled)
+        run_command = runner.prepare_run_command(year=2016, day=1)
+        assert not any("{" in c for c in run_command)
+        assert runner.prepare_run_command(year=2016, day=2) != run_command
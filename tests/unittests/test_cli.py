@@ -9,12 +9,9 @@ ESB - Script your way to rescue Christmas as part of the ElfScript Brigade team.
 (Thank you [Eric 😉!](https://twitter.com/ericwastl)).
 """
 
-import os
 import shutil
-import unittest
 from argparse import ArgumentTypeError, Namespace
 from datetime import datetime
-from pathlib import Path
 from zoneinfo import ZoneInfo
 
 import pytest
@@ -22,62 +19,60 @@ import pytest
 from esb.cli import aoc_day, aoc_part, aoc_year, esb_parser, main
 from esb.lib.langs import LangMap
 from esb.lib.paths import CacheInputSled, CacheTestSled, LangSled
-from tests.fixtures import CliMock, TestWithInitializedEsbRepo, TestWithTemporaryDirectory
-from tests.mock import INPUT_2016_01, SOLUTION_2016_01_PYTHON, STATEMENT_2016_01, TEST_2016_01
+from tests.fixtures import (
+    HttpMock,
+    TestWithEsbRepoTemplate,
+    TestWithInitializedEsbRepo,
+    TestWithTemporaryDirectory,
+)
+from tests.mock import INPUT_2016_01, SOLUTION_2016_01_PYTHON, STATEMENT_2016_01, TEST_2016_01, read_mock
 
 
-class TestParserTypes(unittest.TestCase):
+class TestParserTypes:
     def test_aoc_day_single(self):
-        for day in range(1, 26):
-            with self.subTest(aoc_day=day):
-                assert aoc_day(str(day)) == day
-
-    def test_aoc_day_error(self):
-        for day in [0, 26, "twenty-seven"]:
-            with (
-                self.subTest(aoc_day=day, error=True),
-                pytest.raises(ArgumentTypeError, match="is not a valid AoC day"),
-            ):
-                aoc_day(str(day))
+        days = list(range(1, 26))
+        assert [aoc_day(str(day)) for day in days] == days
+
+    @pytest.mark.parametrize("day", [0, 26, "twenty-seven"])
+    def test_aoc_day_error(self, day):
+        with pytest.raises(ArgumentTypeError, match="is not a valid AoC day"):
+            aoc_day(str(day))
 
     def test_aoc_day_all(self):
         assert aoc_day("all") == list(range(1, 26))
 
     def test_aoc_year_single(self):
-        for year in range(2015, 2024):
-            with self.subTest(aoc_year=year):
-                assert aoc_year(str(year)) == year
-
-    def test_aoc_year_error(self):
-        for year in [2014, 2031, "twenty-seven"]:
-            with (
-                self.subTest(aoc_year=year, error=True),
-                pytest.raises(ArgumentTypeError, match="is not a valid AoC year"),
-            ):
-                aoc_year(str(year))
+        years = list(range(2015, 2024))
+        assert [aoc_year(str(year)) for year in years] == years
+
+    @pytest.mark.parametrize("year", [2014, 2031, "twenty-seven"])
+    def test_aoc_year_error(self, year):
+        with pytest.raises(ArgumentTypeError, match="is not a valid AoC year"):
+            aoc_year(str(year))
 
     def test_aoc_year_all(self):
         now = datetime.now(tz=ZoneInfo("EST"))
         assert aoc_year("all") == list(range(2015, now.year + 1))
 
     def test_aoc_part_single(self):
-        for part in range(1, 3):
-            with self.subTest(aoc_part=part):
-                assert aoc_part(str(part)) == part
-
-    def test_aoc_part_error(self):
-        for part in [0, 26, "twenty-seven"]:
-            with (
-                self.subTest(aoc_part=part, error=True),
-                pytest.raises(ArgumentTypeError, match="is not a valid AoC part"),
-            ):
-                aoc_part(str(part))
+        parts = [1, 2]
+        assert [aoc_part(str(part)) for part in parts] == parts
+
+    @pytest.mark.parametrize("part", [0, 26, "twenty-seven"])
+    def test_aoc_part_error(self, part):
+        with pytest.raises(ArgumentTypeError, match="is not a valid AoC part"):
+            aoc_part(str(part))
 
     def test_aoc_part_all(self):
         assert aoc_part("all") == (1, 2)
 
 
 class TestEsbParser(TestWithInitializedEsbRepo):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.parser = esb_parser()
+
     def test_working_commands(self):
         commands = [
             "esb init",
@@ -90,40 +85,28 @@ class TestEsbParser(TestWithInitializedEsbRepo):
             "esb run -y 2016 -d 9 -l python -s --part 2",
             "esb dashboard",
         ]
-        self.parser = esb_parser()
         for command in commands:
             [_, *args] = command.split()
             with self.subTest(command=f"Working command: {command}"):
                 args = self.parser.parse_args(args)
                 assert isinstance(args, Namespace)
 
+    def test_parser_is_built_once(self):
+        assert esb_parser() is self.parser
+
     def test_non_working_commands(self):
         commands = [
             "esb init --year 2014",
             "esb wrong_command",
             "esb start --year 2016 --day 9 --jorge 123",
         ]
-        self.parser = esb_parser()
         for command in commands:
             [_, *args] = command.split()
             with self.subTest(command=f"Non working command: {command}"), pytest.raises(SystemExit, match="2"):
                 self.parser.parse_args(args)
 
 
-class TestCli(TestWithTemporaryDirectory):
-    """
-    Commands:
-
-    init
-    fetch
-    start
-    show
-    status
-    test
-    run
-    dashboard
-    """
-
+class EsbCommands:
     TEST_YEAR = 2016
     TEST_DAY = 1
     TEST_PART = 1
@@ -140,144 +123,178 @@ class TestCli(TestWithTemporaryDirectory):
     cmd_test = f"esb test --year {TEST_YEAR} --day {TEST_DAY} --lang {language_name} --part {TEST_PART}".split()
 
     def esb_new(self):
-        with CliMock(self.cmd_init, [""]):
-            main()
+        with self.cli_mock([""]):
+            main(self.cmd_init[1:])
 
-    def esb_fetch(self):
-        http_response = [STATEMENT_2016_01.read_text(), INPUT_2016_01.read_text()]
-        with CliMock(self.cmd_fetch, http_response):
-            main()
 
+class TestCliOutsideEsbRepo(EsbCommands, TestWithTemporaryDirectory):
     def test_new(self):
         command = self.cmd_init
-        with CliMock(command) as clim:
-            main()
+        with self.cli_mock() as clim:
+            main(command[1:])
         text = clim.stderr.getvalue()
         assert "Thank you for saving Christmas" in text
 
     def test_new_must_fail_when_runing_in_an_esb_repo(self):
         self.esb_new()
         command = self.cmd_init
-        with CliMock(command) as clim, pytest.raises(SystemExit, match="1"):
-            main()
+        with self.cli_mock() as clim, pytest.raises(SystemExit, match="1"):
+            main(command[1:])
         text = clim.stderr.getvalue()
         assert "Cannot initialize" in text
 
-    def test_fetch(self):
-        self.esb_new()
+    def test_status_should_fail_when_running_not_in_an_esb_repo(self):
+        command = self.cmd_status
+        with self.cli_mock() as clim, pytest.raises(SystemExit, match="2"):
+            main(command[1:])
+        text = clim.stderr.getvalue()
+        assert "Fatal: this is not an ElfScript Brigade repo" in text
+
+    def test_status_should_fail_with_a_relative_cwd_not_in_an_esb_repo(self):
+        sub_dir = self.repo_root / "test_dir"
+        sub_dir.mkdir()
 
-        repo_root = Path.cwd()
-        cs = CacheInputSled(repo_root)
+        command = self.cmd_status
+        with self.cli_mock() as clim, pytest.raises(SystemExit, match="2"):
+            main(command[1:], cwd=sub_dir.relative_to(self.repo_root))
+        text = clim.stderr.getvalue()
+        assert "Fatal: this is not an ElfScript Brigade repo" in text
+
+
+class TestCli(EsbCommands, TestWithEsbRepoTemplate):
+    """
+    Commands:
+
+    fetch
+    start
+    show
+    status
+    test
+    run
+    dashboard
+
+    Every test starts from a copy of a freshly initialized repo
+    """
+
+    http: HttpMock
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.http = HttpMock([""])
+        cls.http.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.http.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.http.respond([""])
+
+    def esb_fetch(self):
+        self.http.respond([read_mock(STATEMENT_2016_01), read_mock(INPUT_2016_01)])
+        with self.cli_mock():
+            main(self.cmd_fetch[1:])
+
+    def test_fetch(self):
+        cs = CacheInputSled(self.repo_root)
         statement_file = cs.path("statement", self.TEST_YEAR, self.TEST_DAY)
         input_file = cs.path("input", self.TEST_YEAR, self.TEST_DAY)
         assert not statement_file.is_file()
         assert not input_file.is_file()
 
         command = self.cmd_fetch
-        http_response = [STATEMENT_2016_01.read_text()]
-        with CliMock(command, http_response) as clim:
-            main()
+        http_response = [read_mock(STATEMENT_2016_01)]
+        self.http.respond(http_response)
+        with self.cli_mock() as clim:
+            main(command[1:])
         text = clim.stderr.getvalue()
         assert "Fetched year" in text
         assert statement_file.is_file()
         assert input_file.is_file()
 
     def test_start(self):
-        self.esb_new()
         command = self.cmd_start
-        http_response = [STATEMENT_2016_01.read_text()]
-        with CliMock(command, http_response) as clim:
-            main()
+        http_response = [read_mock(STATEMENT_2016_01)]
+        self.http.respond(http_response)
+        with self.cli_mock() as clim:
+            main(command[1:])
         text = clim.stderr.getvalue()
         assert "Started code for" in text, text
 
         lmap = LangMap.load_defaults()
         lang = lmap.get(self.language_name)
-        lang_sled = LangSled.from_spec(repo_root=Path.cwd(), spec=lang)
+        lang_sled = LangSled.from_spec(repo_root=self.repo_root, spec=lang)
         for dst in lang_sled.copied_map(self.TEST_YEAR, self.TEST_DAY).values():
             assert dst.is_file()
 
     def test_show(self):
-        self.esb_new()
         self.esb_fetch()
         command = self.cmd_show
-        http_response = [STATEMENT_2016_01.read_text()]
-        with CliMock(command, http_response) as clim:
-            main()
+        http_response = [read_mock(STATEMENT_2016_01)]
+        self.http.respond(http_response)
+        with self.cli_mock() as clim:
+            main(command[1:])
         text = clim.stdout.getvalue()
         assert "Solution pt1" in text, text
 
     def test_status(self):
-        self.esb_new()
-
         command = self.cmd_status
-        with CliMock(command) as clim:
-            main()
+        with self.cli_mock() as clim:
+            main(command[1:])
         text = clim.stdout.getvalue()
         assert "ELFSCRIPT BRIGADE STATUS REPORT" in text
 
     def test_status_runs_in_any_esb_repo_subdir(self):
-        self.esb_new()
-
-        dir_name = "test_dir"
-        Path(dir_name).mkdir()
-        os.chdir(dir_name)
+        sub_dir = self.repo_root / "test_dir"
+        sub_dir.mkdir()
 
         command = self.cmd_status
-        with CliMock(command) as clim:
-            main()
+        with self.cli_mock() as clim:
+            main(command[1:], cwd=sub_dir)
         text = clim.stdout.getvalue()
         assert "ELFSCRIPT BRIGADE STATUS REPORT" in text
 
-    def test_status_should_fail_when_running_not_in_an_esb_repo(self):
-        command = self.cmd_status
-        with CliMock(command) as clim, pytest.raises(SystemExit, match="2"):
-            main()
-        text = clim.stderr.getvalue()
-        assert "Fatal: this is not an ElfScript Brigade repo" in text
-
     def test_dashboard(self):
-        self.esb_new()
-
         command = self.cmd_dashboard
-        with CliMock(command) as clim:
-            main()
+        with self.cli_mock() as clim:
+            main(command[1:])
         text = clim.stdout.getvalue()
         assert "Dashboard rebuilt successfully!" in text
 
     def test_run(self):
-        self.esb_new()
-
         command = self.cmd_start
-        http_response = [STATEMENT_2016_01.read_text(), INPUT_2016_01.read_text()]
-        with CliMock(command, http_response) as clim:
-            main()
+        http_response = [read_mock(STATEMENT_2016_01), read_mock(INPUT_2016_01)]
+        self.http.respond(http_response)
+        with self.cli_mock() as clim:
+            main(command[1:])
 
         lmap = LangMap.load_defaults()
         lang = lmap.get(self.language_name)
-        lang_sled = LangSled.from_spec(repo_root=Path.cwd(), spec=lang)
+        lang_sled = LangSled.from_spec(repo_root=self.repo_root, spec=lang)
         day_dir = lang_sled.day_dir(self.TEST_YEAR, self.TEST_DAY)
 
         shutil.copy(SOLUTION_2016_01_PYTHON, day_dir)
 
         command = self.cmd_run
-        with CliMock(command) as clim:
-            main()
+        with self.cli_mock() as clim:
+            main(command[1:])
         text = clim.stderr.getvalue()
         assert "✔ Answer pt1:" in text
 
     def test_test(self):
-        self.esb_new()
-
         command = self.cmd_start
-        http_response = [STATEMENT_2016_01.read_text(), INPUT_2016_01.read_text()]
-        with CliMock(command, http_response) as clim:
-            main()
+        http_response = [read_mock(STATEMENT_2016_01), read_mock(INPUT_2016_01)]
+        self.http.respond(http_response)
+        with self.cli_mock() as clim:
+            main(command[1:])
 
         lmap = LangMap.load_defaults()
         lang = lmap.get(self.language_name)
-        lang_sled = LangSled.from_spec(repo_root=Path.cwd(), spec=lang)
-        test_sled = CacheTestSled(repo_root=Path.cwd())
+        lang_sled = LangSled.from_spec(repo_root=self.repo_root, spec=lang)
+        test_sled = CacheTestSled(repo_root=self.repo_root)
 
         day_dir = lang_sled.day_dir(self.TEST_YEAR, self.TEST_DAY)
         test_day_dir = test_sled.day_dir(self.TEST_YEAR, self.TEST_DAY)
@@ -286,23 +303,22 @@ class TestCli(TestWithTemporaryDirectory):
         shutil.copy(TEST_2016_01, test_day_dir)
 
         command = self.cmd_test
-        with CliMock(command) as clim:
-            main()
+        with self.cli_mock() as clim:
+            main(command[1:])
         text = clim.stderr.getvalue()
         assert "✔ Answer" in text
         assert "✘" not in text
 
     def test_command_cache(self):
-        self.esb_new()
-
         command = self.cmd_start
-        http_response = [STATEMENT_2016_01.read_text(), INPUT_2016_01.read_text()]
-        with CliMock(command, http_response):
-            main()
+        http_response = [read_mock(STATEMENT_2016_01), read_mock(INPUT_2016_01)]
+        self.http.respond(http_response)
+        with self.cli_mock():
+            main(command[1:])
 
         command = self.cmd_run_cached
-        with CliMock(command) as clim:
-            main()
+        with self.cli_mock() as clim:
+            main(command[1:])
 
         text = clim.stderr.getvalue()
         assert "✘ Answer" in text
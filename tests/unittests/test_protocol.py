@@ -21,6 +21,7 @@ import pytest
 from esb.protocol.fireplace import (
     FPPart,
     FPStatus,
+    FPWorker,
     MetricPrefix,
     exec_protocol_from_file,
     parse_running_time,
@@ -49,7 +50,7 @@ class TestRunSolutions:
 
     @staticmethod
     def v1_run_context(input_data: str, command_args: tuple[str, ...]):
-        input_io = io.StringIO(input_data)
+        input_io = io.TextIOWrapper(io.BytesIO(input_data.encode()), encoding="utf-8")
         with (
             patch("sys.argv", ["command_name", *command_args]),
             patch("sys.stdin", input_io),
@@ -142,6 +143,102 @@ class TestExecProtocol:
         assert isinstance(result.running_time, int)
         assert isinstance(result.unit, MetricPrefix)
 
+    def test_exec_protocol_returns_the_output_instead_of_printing_it(self):
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            result = self.exec_protocol_from_file_context(
+                self.command, part=1, cwd=Path.cwd(), input_data=TWO_LINES_INPUT
+            )
+            single = self.exec_protocol_from_file_context(self.command, part=1, cwd=Path.cwd(), input_data=TEST_INPUT)
+        assert stdout.getvalue() == ""
+        assert result.output is not None
+        assert result.output.startswith(f"{TWO_LINES_INPUT}\nRT ")
+        assert single.output is None
+
+    def test_exec_protocol_handles_inputs_larger_than_the_pipe_buffer(self):
+        large_input = "x" * 200_000
+        result = self.exec_protocol_from_file_context(self.command, part=1, cwd=Path.cwd(), input_data=large_input)
+        assert result.status == FPStatus.Ok
+        assert result.answer == large_input
+
+
+class TestWorker:
+    command = ("python", "tests/mock/solution.py", "--worker")
+
+    def test_worker_solves_many_inputs_with_a_single_process(self):
+        with FPWorker(list(self.command), Path.cwd()) as worker:
+            result_pt1 = worker.exec_protocol(1, None, TEST_INPUT.encode())
+            pid = worker.proc.pid if worker.proc is not None else None
+            result_pt2 = worker.exec_protocol(2, None, TEST_INPUT.encode())
+            assert worker.proc is not None
+            assert worker.proc.pid == pid
+        assert worker.proc is None
+
+        assert result_pt1.status == FPStatus.Ok
+        assert result_pt1.answer == TEST_INPUT
+        assert isinstance(result_pt1.running_time, int)
+        assert isinstance(result_pt1.unit, MetricPrefix)
+        assert result_pt2.status == FPStatus.Ok
+        assert result_pt2.answer == str(PT2_SOLUTION)
+
+    def test_worker_can_output_more_than_one_line(self):
+        with FPWorker(list(self.command), Path.cwd()) as worker:
+            result = worker.exec_protocol(1, None, TWO_LINES_INPUT.encode())
+        assert result.status == FPStatus.Ok
+        assert result.answer == TWO_LINES_INPUT
+        assert result.output is not None
+        assert result.output.startswith(f"{TWO_LINES_INPUT}\nRT ")
+
+    def test_worker_passes_arguments(self):
+        args = ["a b", "c"]
+        with FPWorker(list(self.command), Path.cwd()) as worker:
+            result = worker.exec_protocol(1, args, TEST_INPUT.encode())
+        assert result.status == FPStatus.Ok
+        assert result.answer == " ".join(args)
+
+    def test_worker_fails_when_the_process_exits(self):
+        with FPWorker(["python", "-c", "pass"], Path.cwd()) as worker:
+            result = worker.exec_protocol(1, None, TEST_INPUT.encode())
+        assert result.status == FPStatus.ProtocolError
+
+    def test_worker_closes_its_pipes(self):
+        with FPWorker(list(self.command), Path.cwd()) as worker:
+            worker.exec_protocol(1, None, TEST_INPUT.encode())
+            proc = worker.proc
+        assert proc is not None
+        assert proc.stdin is not None
+        assert proc.stdin.closed
+        assert proc.stdout is not None
+        assert proc.stdout.closed
+        assert proc.returncode == 0
+
+    def test_worker_is_killed_when_it_does_not_exit(self):
+        command = ["python", "-c", "import time; time.sleep(60)"]
+        with patch("esb.protocol.fireplace.WORKER_EXIT_TIMEOUT", 0.1), FPWorker(command, Path.cwd()) as worker:
+            proc = worker.start()
+        assert proc.returncode is not None
+        assert proc.returncode != 0
+
+
+class TestParseRunningTime:
+    @pytest.mark.parametrize(
+        ("line", "answer"),
+        [
+            ("RT 123 ns", (123, MetricPrefix.nano)),
+            ("RT 123 nanoseconds", (123, MetricPrefix.nano)),
+            ("RT 45 μs", (45, MetricPrefix.micro)),
+            ("RT 6 milliseconds", (6, MetricPrefix.milli)),
+            ("RT 7 s", (7, MetricPrefix._)),  # noqa: SLF001
+            ("RT 7 second", (7, MetricPrefix._)),  # noqa: SLF001
+        ],
+    )
+    def test_parse_running_time(self, line, answer):
+        assert parse_running_time(line) == answer
+
+    @pytest.mark.parametrize("line", ["RT", "RT 123", "RT abc ns", "RT 123 nanopeters", "XX 123 ns"])
+    def test_parse_running_time_fail(self, line):
+        with pytest.raises(ValueError, match="Could not parse running time"):
+            parse_running_time(line)
+
 
 class TestMetricPrefix:
     sample_value = 1.23